@@ -1,14 +1,50 @@
 import os
+import sys
 import time
+import httpx
+import orjson
 from flask import Flask, request
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
 from supabase import create_client, Client
+from supabase.lib.client_options import ClientOptions
 from twilio.rest import Client as TwilioClient
 from datetime import datetime
-import schedule
+from concurrent.futures import ThreadPoolExecutor
+from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.executors.pool import ThreadPoolExecutor as APSThreadPoolExecutor
+from apscheduler.triggers.cron import CronTrigger
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
 import threading
 
 # --- Flask App Initialization ---
+class OrJSONProvider(JSONProvider):
+    """Parses/serializes JSON with orjson (a C extension, ~3-5x faster than
+    stdlib json). Webhook payloads carry full subject rows with every date
+    column, so parsing them is the biggest JSON cost left in the app."""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrJSONProvider(app)
+Compress(app)
+
+# Webhook handlers hand the Supabase/Twilio work to this pool so they can
+# return 200 immediately — Supabase retries webhooks that respond slowly.
+_webhook_executor = ThreadPoolExecutor(max_workers=4)
+
+def _log_background_failure(future):
+    """Done-callback so errors in background webhook work don't vanish."""
+    exc = future.exception()
+    if exc:
+        print(f"❌ Background webhook task failed: {exc}")
+
+def submit_webhook_task(fn, *args):
+    """Runs fn on the webhook pool, logging any exception it raises."""
+    _webhook_executor.submit(fn, *args).add_done_callback(_log_background_failure)
 
 # --- 1. CREDENTIALS (Set these in Render's Environment Variables) ---
 SUPABASE_URL = os.environ.get("SUPABASE_URL")
@@ -18,8 +54,38 @@ TWILIO_AUTH_TOKEN = os.environ.get("TWILIO_AUTH_TOKEN")
 TWILIO_WHATSAPP_NUMBER = 'whatsapp:+14155238886'
 
 # --- 2. INITIALIZE CLIENTS ---
+def configure_postgrest_pool(client: Client):
+    """
+    Replaces the default per-call HTTP session with a pooled keep-alive
+    HTTP/2 client, so concurrent webhooks and the scheduler reuse warm
+    TLS connections instead of paying the handshake on every request.
+    """
+    old_session = client.postgrest.session
+    # PostgREST honors Accept-Encoding and compresses its JSON responses;
+    # httpx decompresses transparently. gzip only — decoding br would need
+    # the optional brotli package.
+    headers = dict(old_session.headers)
+    headers['Accept-Encoding'] = 'gzip'
+    client.postgrest.session = httpx.Client(
+        base_url=old_session.base_url,
+        headers=headers,
+        http2=True,
+        limits=httpx.Limits(
+            max_keepalive_connections=10,
+            max_connections=20,
+            keepalive_expiry=30.0
+        ),
+        timeout=httpx.Timeout(10.0, connect=5.0)
+    )
+
 try:
-    supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
+    # Bounded timeouts so a stalled Supabase call can't hang a webhook or
+    # scheduled job indefinitely.
+    supabase: Client = create_client(
+        SUPABASE_URL, SUPABASE_KEY,
+        options=ClientOptions(postgrest_client_timeout=10)
+    )
+    configure_postgrest_pool(supabase)
     twilio_client = TwilioClient(TWILIO_ACCOUNT_SID, TWILIO_AUTH_TOKEN)
     print("✅ Successfully connected to Supabase and Twilio.")
 except Exception as e:
@@ -35,64 +101,25 @@ SUBJECT_TABLES = [
     'software_engineering_lab', 'technical_communication'
 ]
 
-def format_subject_name(table_name):
-    """Formats a table name into a readable subject name."""
-    return table_name.replace('_', ' ').title()
-
-def get_student_data(roll_no: str) -> dict:
+@retry(stop=stop_after_attempt(3),
+       wait=wait_random_exponential(multiplier=0.2, max=2),
+       retry=retry_if_exception_type((httpx.TransportError, httpx.TimeoutException)),
+       reraise=True)
+def execute_with_retry(query):
     """
-    Fetches all attendance data, separating theory and lab totals,
-    mirroring the logic from the successful techno-njr app.
+    Executes a PostgREST query/RPC builder, retrying transient network
+    failures ("Network request failed", timeouts) with jittered backoff so
+    a dropped connection doesn't surface as a missed notification.
     """
-    print(f"Fetching data for Roll No: {roll_no}")
-    try:
-        student_info_res = supabase.table('studentsrecord').select('Name, whatsapp_no').eq('Roll_No', roll_no).single().execute()
-        if not student_info_res.data:
-            return {"error": "Student not found in studentsrecord."}
-        
-        student_details = student_info_res.data
-        theory_present, theory_total = 0, 0
-        lab_present, lab_total = 0, 0
-        todays_attendance = []
-        today_str = datetime.now().strftime('%d_%m_%Y')
+    return query.execute()
 
-        for table in SUBJECT_TABLES:
-            try:
-                response = supabase.table(table).select(f'*').eq('Roll_No', roll_no).single().execute()
-                if response.data:
-                    subject_present, subject_total = 0, 0
-                    for column, value in response.data.items():
-                        if column.count('_') == 2 and value in ['P', 'A']:
-                            subject_total += 1
-                            if value == 'P':
-                                subject_present += 1
-                    
-                    # Separate totals for theory and lab subjects
-                    if table.endswith('_lab'):
-                        lab_present += subject_present
-                        lab_total += subject_total
-                    else:
-                        theory_present += subject_present
-                        theory_total += subject_total
-
-                    if today_str in response.data and response.data[today_str] in ['P', 'A']:
-                        todays_attendance.append({
-                            "subject": format_subject_name(table),
-                            "status": response.data[today_str]
-                        })
-            except Exception:
-                continue
-
-        return {
-            "name": student_details.get('Name'),
-            "whatsapp_no": student_details.get('whatsapp_no'),
-            "theory_present": theory_present, "theory_total": theory_total,
-            "lab_present": lab_present, "lab_total": lab_total,
-            "todays_attendance": todays_attendance
-        }
-    except Exception as e:
-        print(f"❌ Critical error fetching data for {roll_no}: {e}")
-        return {"error": "An error occurred while fetching student data."}
+# The table list is static, so build the display-name lookup once instead
+# of re-deriving it per student in the hot loops.
+SUBJECT_DISPLAY = {t: t.replace('_', ' ').title() for t in SUBJECT_TABLES}
+
+def format_subject_name(table_name):
+    """Formats a table name into a readable subject name."""
+    return SUBJECT_DISPLAY.get(table_name) or table_name.replace('_', ' ').title()
 
 def format_morning_message(data: dict) -> str:
     """Formats the predictive 7 AM message using ONLY theory stats."""
@@ -129,12 +156,30 @@ def format_evening_message(data: dict) -> str:
         message += "No attendance was marked for you today.\n"
     return message
 
+# Twilio allows concurrent API calls; pace them to its default rate limit
+# instead of sleeping a full second between students.
+SEND_MAX_WORKERS = 10
+SEND_RATE_PER_SEC = 10
+_send_lock = threading.Lock()
+_next_send_at = 0.0
+
+def _throttle_send():
+    """Spaces message sends out to SEND_RATE_PER_SEC across all threads."""
+    global _next_send_at
+    with _send_lock:
+        now = time.monotonic()
+        wait = _next_send_at - now
+        _next_send_at = max(now, _next_send_at) + 1.0 / SEND_RATE_PER_SEC
+    if wait > 0:
+        time.sleep(wait)
+
 def send_whatsapp_notification(whatsapp_no: str, message: str):
     """Sends a message using Twilio."""
     if not whatsapp_no:
         print("Cannot send message, no WhatsApp number provided.")
         return
     try:
+        _throttle_send()
         twilio_client.messages.create(
             from_=TWILIO_WHATSAPP_NUMBER,
             body=message,
@@ -158,12 +203,18 @@ def handle_new_student():
     print("Received 'new-student-webhook':", payload)
     if payload.get('type') == 'INSERT':
         record = payload.get('record', {})
-        roll_no = record.get('Roll_No')
-        if roll_no:
-            student_data = get_student_data(roll_no)
-            if not student_data.get("error"):
-                message = format_evening_message(student_data)
-                send_whatsapp_notification(student_data.get('whatsapp_no'), message)
+        if record.get('Roll_No'):
+            # The webhook already delivers the inserted row, and a brand-new
+            # student has no attendance yet, so there is nothing to fetch.
+            student_data = {
+                "name": record.get('Name'),
+                "whatsapp_no": record.get('whatsapp_no'),
+                "theory_present": 0, "theory_total": 0,
+                "lab_present": 0, "lab_total": 0,
+                "todays_attendance": []
+            }
+            message = format_evening_message(student_data)
+            submit_webhook_task(send_whatsapp_notification, student_data['whatsapp_no'], message)
     return {"status": "received"}, 200
 
 @app.route('/absent-alert-webhook', methods=['POST'])
@@ -181,11 +232,21 @@ def handle_absent_alert():
             table_name = payload.get('table')
             subject_name = format_subject_name(table_name)
             
-            student_info_res = supabase.table('studentsrecord').select('whatsapp_no').eq('Roll_No', roll_no).single().execute()
-            if student_info_res.data and student_info_res.data.get('whatsapp_no'):
-                whatsapp_no = student_info_res.data['whatsapp_no']
-                message = f"🚨 Absent Alert! You have been marked absent in today's *{subject_name}* class."
-                send_whatsapp_notification(whatsapp_no, message)
+            def notify_absent():
+                # Subject tables carry a denormalized whatsapp_no column (see
+                # sql/04_subject_whatsapp_no.sql), so the payload usually has the
+                # number already; fall back to a lookup for rows that predate it.
+                whatsapp_no = record.get('whatsapp_no')
+                if not whatsapp_no:
+                    student_info_res = execute_with_retry(
+                        supabase.table('studentsrecord').select('whatsapp_no').eq('Roll_No', roll_no).single())
+                    if student_info_res.data:
+                        whatsapp_no = student_info_res.data.get('whatsapp_no')
+                if whatsapp_no:
+                    message = f"🚨 Absent Alert! You have been marked absent in today's *{subject_name}* class."
+                    send_whatsapp_notification(whatsapp_no, message)
+
+            submit_webhook_task(notify_absent)
     return {"status": "received"}, 200
 
 # --- 5. SCHEDULER LOGIC ---
@@ -195,29 +256,73 @@ def run_scheduled_job(message_formatter):
     job_name = message_formatter.__name__
     print(f"\n--- Running Scheduled Job: {job_name} at {datetime.now()} ---")
     try:
-        response = supabase.table('studentsrecord').select('Roll_No').not_.is_('whatsapp_no', 'null').execute()
+        # One bulk query over the precomputed snapshot (refreshed five minutes
+        # before each job; see sql/06_daily_student_snapshot.sql).
+        response = execute_with_retry(
+            supabase.table('daily_student_snapshot').select(
+                'name,whatsapp_no,theory_present,theory_total,lab_present,lab_total,todays_json'
+            ).not_.is_('whatsapp_no', 'null'))
         students = response.data
-        for student in students:
-            roll_no = student['Roll_No']
-            student_data = get_student_data(roll_no)
-            if not student_data.get("error") and student_data.get("theory_total", 0) > 0:
+
+        def send_one(student):
+            if student.get('theory_total', 0) > 0:
+                student_data = {
+                    "name": student['name'],
+                    "whatsapp_no": student['whatsapp_no'],
+                    "theory_present": student['theory_present'], "theory_total": student['theory_total'],
+                    "lab_present": student['lab_present'], "lab_total": student['lab_total'],
+                    "todays_attendance": [
+                        {"subject": format_subject_name(item['subject']), "status": item['status']}
+                        for item in (student.get('todays_json') or [])
+                    ]
+                }
                 message = message_formatter(student_data)
                 send_whatsapp_notification(student_data['whatsapp_no'], message)
-                time.sleep(1)
+
+        # Sends are I/O-bound HTTPS calls, so fan them out across a bounded
+        # pool; _throttle_send keeps us under Twilio's rate limit.
+        with ThreadPoolExecutor(max_workers=SEND_MAX_WORKERS) as executor:
+            list(executor.map(send_one, students))
     except Exception as e:
         print(f"❌ Error during scheduled job '{job_name}': {e}")
 
-def run_scheduler():
-    """Continuously runs the scheduler in the background."""
-    schedule.every().day.at("07:00").do(run_scheduled_job, format_morning_message)
-    schedule.every().day.at("16:00").do(run_scheduled_job, format_evening_message)
-    while True:
-        schedule.run_pending()
-        time.sleep(60)
+def refresh_student_snapshot():
+    """Recomputes the daily_student_snapshot materialized view."""
+    print(f"\n--- Refreshing daily_student_snapshot at {datetime.now()} ---")
+    try:
+        execute_with_retry(supabase.rpc('refresh_daily_student_snapshot', {}))
+        print("✅ Snapshot refreshed.")
+    except Exception as e:
+        print(f"❌ Error refreshing snapshot: {e}")
+
+def start_scheduler():
+    """
+    Starts the background scheduler with the two daily jobs. APScheduler
+    sleeps until the next trigger fires, so the process idles between jobs
+    instead of waking every minute to poll.
+    """
+    scheduler = BackgroundScheduler(
+        executors={'default': APSThreadPoolExecutor(4)},
+        job_defaults={'coalesce': True, 'max_instances': 1, 'misfire_grace_time': 300}
+    )
+    # Refresh the snapshot five minutes before each send so both jobs read
+    # freshly rolled-up rows.
+    scheduler.add_job(refresh_student_snapshot, CronTrigger(hour=6, minute=55))
+    scheduler.add_job(refresh_student_snapshot, CronTrigger(hour=15, minute=55))
+    scheduler.add_job(run_scheduled_job, CronTrigger(hour=7), args=[format_morning_message])
+    scheduler.add_job(run_scheduled_job, CronTrigger(hour=16), args=[format_evening_message])
+    scheduler.start()
+    return scheduler
 
 # --- 6. START THE APP ---
 if __name__ == "__main__":
-    scheduler_thread = threading.Thread(target=run_scheduler)
-    scheduler_thread.daemon = True
-    scheduler_thread.start()
-    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 10000)))
+    # Under gunicorn (the Procfile web process) this block never runs, and
+    # starting the scheduler at import time would double-send with -w 2, so
+    # the Procfile runs 'python app.py scheduler' as a dedicated worker.
+    if len(sys.argv) > 1 and sys.argv[1] == 'scheduler':
+        start_scheduler()
+        while True:
+            time.sleep(3600)
+    else:
+        start_scheduler()
+        app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 10000)))
@@ -0,0 +1,64 @@
+-- Run this in the Supabase SQL editor.
+--
+-- Returns everything the app needs for one student in a single call:
+-- the studentsrecord row plus per-subject present/total counts and
+-- today's status, so the Python side no longer needs one query per
+-- subject table.
+
+create or replace function get_student_attendance(p_roll text)
+returns json
+language plpgsql
+stable
+as $$
+declare
+    v_student  json;
+    v_subjects jsonb := '[]'::jsonb;
+    v_tables   text[] := array[
+        'advance_engineering_mathematics_i', 'data_structures_and_algorithms',
+        'data_structures_and_algorithms_lab', 'digital_electronics',
+        'digital_electronics_lab', 'object_oriented_programming',
+        'object_oriented_programming_lab', 'software_engineering',
+        'software_engineering_lab', 'technical_communication'
+    ];
+    v_table    text;
+    v_row      jsonb;
+    v_present  int;
+    v_total    int;
+    v_today    text := to_char(now(), 'DD_MM_YYYY');
+begin
+    select row_to_json(s) into v_student
+    from (
+        select "Name", whatsapp_no
+        from studentsrecord
+        where "Roll_No" = p_roll
+    ) s;
+
+    if v_student is null then
+        return null;
+    end if;
+
+    foreach v_table in array v_tables loop
+        execute format('select to_jsonb(t) from %I t where "Roll_No" = $1', v_table)
+        into v_row
+        using p_roll;
+
+        if v_row is not null then
+            -- Date columns are named DD_MM_YYYY and hold 'P' or 'A'.
+            select count(*) filter (where e.value = 'P'),
+                   count(*) filter (where e.value in ('P', 'A'))
+            into v_present, v_total
+            from jsonb_each_text(v_row) e
+            where e.key ~ '^\d{2}_\d{2}_\d{4}$';
+
+            v_subjects := v_subjects || jsonb_build_object(
+                'subject', v_table,
+                'present', v_present,
+                'total',   v_total,
+                'today',   v_row ->> v_today
+            );
+        end if;
+    end loop;
+
+    return json_build_object('student', v_student, 'subjects', v_subjects);
+end;
+$$;
@@ -0,0 +1,120 @@
+-- Run this in the Supabase SQL editor (after 01_get_student_attendance.sql).
+--
+-- Adds precomputed present_count/total_count columns to every subject
+-- table, kept up to date by a trigger, so reads no longer have to scan
+-- every date column of every row.
+
+do $$
+declare
+    v_table text;
+begin
+    foreach v_table in array array[
+        'advance_engineering_mathematics_i', 'data_structures_and_algorithms',
+        'data_structures_and_algorithms_lab', 'digital_electronics',
+        'digital_electronics_lab', 'object_oriented_programming',
+        'object_oriented_programming_lab', 'software_engineering',
+        'software_engineering_lab', 'technical_communication'
+    ] loop
+        execute format('alter table %I add column if not exists present_count int not null default 0', v_table);
+        execute format('alter table %I add column if not exists total_count int not null default 0', v_table);
+    end loop;
+end;
+$$;
+
+-- Recomputes the counters from the row's date columns (named DD_MM_YYYY,
+-- holding 'P' or 'A') whenever attendance is marked.
+create or replace function update_attendance_counters()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_present int;
+    v_total   int;
+begin
+    select count(*) filter (where e.value = 'P'),
+           count(*) filter (where e.value in ('P', 'A'))
+    into v_present, v_total
+    from jsonb_each_text(to_jsonb(new)) e
+    where e.key ~ '^\d{2}_\d{2}_\d{4}$';
+
+    new.present_count := v_present;
+    new.total_count := v_total;
+    return new;
+end;
+$$;
+
+do $$
+declare
+    v_table text;
+begin
+    foreach v_table in array array[
+        'advance_engineering_mathematics_i', 'data_structures_and_algorithms',
+        'data_structures_and_algorithms_lab', 'digital_electronics',
+        'digital_electronics_lab', 'object_oriented_programming',
+        'object_oriented_programming_lab', 'software_engineering',
+        'software_engineering_lab', 'technical_communication'
+    ] loop
+        execute format('drop trigger if exists trg_attendance_counters on %I', v_table);
+        execute format(
+            'create trigger trg_attendance_counters before insert or update on %I
+             for each row execute function update_attendance_counters()', v_table);
+        -- Backfill existing rows by touching them so the trigger fires.
+        execute format('update %I set present_count = present_count', v_table);
+    end loop;
+end;
+$$;
+
+-- With the counters in place, get_student_attendance only needs three
+-- small columns per subject instead of scanning every date column.
+create or replace function get_student_attendance(p_roll text)
+returns json
+language plpgsql
+stable
+as $$
+declare
+    v_student  json;
+    v_subjects jsonb := '[]'::jsonb;
+    v_tables   text[] := array[
+        'advance_engineering_mathematics_i', 'data_structures_and_algorithms',
+        'data_structures_and_algorithms_lab', 'digital_electronics',
+        'digital_electronics_lab', 'object_oriented_programming',
+        'object_oriented_programming_lab', 'software_engineering',
+        'software_engineering_lab', 'technical_communication'
+    ];
+    v_table    text;
+    v_present  int;
+    v_total    int;
+    v_today_status text;
+    v_today    text := to_char(now(), 'DD_MM_YYYY');
+begin
+    select row_to_json(s) into v_student
+    from (
+        select "Name", whatsapp_no
+        from studentsrecord
+        where "Roll_No" = p_roll
+    ) s;
+
+    if v_student is null then
+        return null;
+    end if;
+
+    foreach v_table in array v_tables loop
+        execute format(
+            'select present_count, total_count, to_jsonb(t) ->> $2 from %I t where "Roll_No" = $1',
+            v_table)
+        into v_present, v_total, v_today_status
+        using p_roll, v_today;
+
+        if v_total is not null then
+            v_subjects := v_subjects || jsonb_build_object(
+                'subject', v_table,
+                'present', v_present,
+                'total',   v_total,
+                'today',   v_today_status
+            );
+        end if;
+    end loop;
+
+    return json_build_object('student', v_student, 'subjects', v_subjects);
+end;
+$$;
@@ -0,0 +1,51 @@
+-- Run this in the Supabase SQL editor (after 02_attendance_counters.sql).
+--
+-- One row per student with everything the scheduled jobs need: name,
+-- WhatsApp number, theory/lab counters and today's per-subject statuses.
+-- Lets run_scheduled_job load the whole class in a single query instead
+-- of one RPC per student.
+
+create or replace view v_student_daily_summary as
+select
+    r."Roll_No"    as roll_no,
+    r."Name"       as name,
+    r.whatsapp_no  as whatsapp_no,
+    coalesce(s1.present_count, 0) + coalesce(s2.present_count, 0)
+        + coalesce(s4.present_count, 0) + coalesce(s6.present_count, 0)
+        + coalesce(s8.present_count, 0) + coalesce(s10.present_count, 0) as theory_present,
+    coalesce(s1.total_count, 0) + coalesce(s2.total_count, 0)
+        + coalesce(s4.total_count, 0) + coalesce(s6.total_count, 0)
+        + coalesce(s8.total_count, 0) + coalesce(s10.total_count, 0)     as theory_total,
+    coalesce(s3.present_count, 0) + coalesce(s5.present_count, 0)
+        + coalesce(s7.present_count, 0) + coalesce(s9.present_count, 0)  as lab_present,
+    coalesce(s3.total_count, 0) + coalesce(s5.total_count, 0)
+        + coalesce(s7.total_count, 0) + coalesce(s9.total_count, 0)      as lab_total,
+    tj.todays_json
+from studentsrecord r
+left join advance_engineering_mathematics_i  s1  on s1."Roll_No"  = r."Roll_No"
+left join data_structures_and_algorithms     s2  on s2."Roll_No"  = r."Roll_No"
+left join data_structures_and_algorithms_lab s3  on s3."Roll_No"  = r."Roll_No"
+left join digital_electronics                s4  on s4."Roll_No"  = r."Roll_No"
+left join digital_electronics_lab            s5  on s5."Roll_No"  = r."Roll_No"
+left join object_oriented_programming        s6  on s6."Roll_No"  = r."Roll_No"
+left join object_oriented_programming_lab    s7  on s7."Roll_No"  = r."Roll_No"
+left join software_engineering               s8  on s8."Roll_No"  = r."Roll_No"
+left join software_engineering_lab           s9  on s9."Roll_No"  = r."Roll_No"
+left join technical_communication            s10 on s10."Roll_No" = r."Roll_No"
+cross join lateral (select to_char(now(), 'DD_MM_YYYY') as col) d
+cross join lateral (
+    select jsonb_agg(jsonb_build_object('subject', x.subject, 'status', x.status)) as todays_json
+    from (values
+        ('advance_engineering_mathematics_i',  to_jsonb(s1)  ->> d.col),
+        ('data_structures_and_algorithms',     to_jsonb(s2)  ->> d.col),
+        ('data_structures_and_algorithms_lab', to_jsonb(s3)  ->> d.col),
+        ('digital_electronics',                to_jsonb(s4)  ->> d.col),
+        ('digital_electronics_lab',            to_jsonb(s5)  ->> d.col),
+        ('object_oriented_programming',        to_jsonb(s6)  ->> d.col),
+        ('object_oriented_programming_lab',    to_jsonb(s7)  ->> d.col),
+        ('software_engineering',               to_jsonb(s8)  ->> d.col),
+        ('software_engineering_lab',           to_jsonb(s9)  ->> d.col),
+        ('technical_communication',            to_jsonb(s10) ->> d.col)
+    ) x(subject, status)
+    where x.status in ('P', 'A')
+) tj;
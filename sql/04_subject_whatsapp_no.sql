@@ -0,0 +1,86 @@
+-- Run this in the Supabase SQL editor (after 03_student_daily_summary.sql).
+--
+-- Denormalizes whatsapp_no from studentsrecord into every subject table
+-- so the absent-alert webhook payload already carries the phone number
+-- and the handler doesn't need a lookup query per alert.
+
+do $$
+declare
+    v_table text;
+begin
+    foreach v_table in array array[
+        'advance_engineering_mathematics_i', 'data_structures_and_algorithms',
+        'data_structures_and_algorithms_lab', 'digital_electronics',
+        'digital_electronics_lab', 'object_oriented_programming',
+        'object_oriented_programming_lab', 'software_engineering',
+        'software_engineering_lab', 'technical_communication'
+    ] loop
+        execute format('alter table %I add column if not exists whatsapp_no text', v_table);
+        -- Backfill from studentsrecord.
+        execute format(
+            'update %I s set whatsapp_no = r.whatsapp_no
+             from studentsrecord r where r."Roll_No" = s."Roll_No"', v_table);
+    end loop;
+end;
+$$;
+
+-- Fills whatsapp_no on subject rows as they are inserted or updated.
+create or replace function sync_subject_whatsapp_no()
+returns trigger
+language plpgsql
+as $$
+begin
+    if new.whatsapp_no is null then
+        select whatsapp_no into new.whatsapp_no
+        from studentsrecord
+        where "Roll_No" = new."Roll_No";
+    end if;
+    return new;
+end;
+$$;
+
+do $$
+declare
+    v_table text;
+begin
+    foreach v_table in array array[
+        'advance_engineering_mathematics_i', 'data_structures_and_algorithms',
+        'data_structures_and_algorithms_lab', 'digital_electronics',
+        'digital_electronics_lab', 'object_oriented_programming',
+        'object_oriented_programming_lab', 'software_engineering',
+        'software_engineering_lab', 'technical_communication'
+    ] loop
+        execute format('drop trigger if exists trg_sync_whatsapp_no on %I', v_table);
+        execute format(
+            'create trigger trg_sync_whatsapp_no before insert or update on %I
+             for each row execute function sync_subject_whatsapp_no()', v_table);
+    end loop;
+end;
+$$;
+
+-- Keeps subject rows in sync when a student changes their number.
+create or replace function propagate_whatsapp_no_change()
+returns trigger
+language plpgsql
+as $$
+declare
+    v_table text;
+begin
+    foreach v_table in array array[
+        'advance_engineering_mathematics_i', 'data_structures_and_algorithms',
+        'data_structures_and_algorithms_lab', 'digital_electronics',
+        'digital_electronics_lab', 'object_oriented_programming',
+        'object_oriented_programming_lab', 'software_engineering',
+        'software_engineering_lab', 'technical_communication'
+    ] loop
+        execute format(
+            'update %I set whatsapp_no = $1 where "Roll_No" = $2', v_table)
+        using new.whatsapp_no, new."Roll_No";
+    end loop;
+    return new;
+end;
+$$;
+
+drop trigger if exists trg_propagate_whatsapp_no on studentsrecord;
+create trigger trg_propagate_whatsapp_no after update of whatsapp_no on studentsrecord
+for each row execute function propagate_whatsapp_no_change();
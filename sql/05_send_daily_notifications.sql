@@ -0,0 +1,78 @@
+-- OPT-IN. Run this in the Supabase SQL editor only if you want the daily
+-- fan-out to run inside Postgres (pg_cron + pg_net) instead of the Flask
+-- scheduler. Requires the pg_cron and pg_net extensions.
+--
+-- Note: pg_net can only POST JSON bodies and Twilio's REST API expects
+-- form-encoded requests with basic auth, so this posts one JSON payload
+-- per student to a relay endpoint (a Supabase Edge Function or this
+-- app's host) that forwards the message to Twilio. The Python scheduler
+-- remains the default; don't schedule both or students get duplicates.
+
+create extension if not exists pg_net;
+
+-- Builds the same morning/evening texts as app.py's formatters from the
+-- summary view and posts them to the relay.
+create or replace function send_daily_notifications(time_of_day text, relay_url text)
+returns int
+language plpgsql
+as $$
+declare
+    v_row record;
+    v_message text;
+    v_perc numeric;
+    v_count int := 0;
+    v_item jsonb;
+begin
+    for v_row in
+        select * from v_student_daily_summary
+        where whatsapp_no is not null and theory_total > 0
+    loop
+        v_perc := round(v_row.theory_present * 100.0 / v_row.theory_total, 2);
+
+        if time_of_day = 'morning' then
+            v_message := format(
+                E'☀️ Good Morning %s!\n\n'
+                'Your current *Overall (Theory)* attendance is *%s%%* (%s/%s).\n\n'
+                '*Today''s Prediction (assuming 4 theory classes):*\n'
+                '✅ Attend all classes: *%s%%*\n'
+                '❌ Miss all classes: *%s%%*\n\n'
+                'Have a great day!',
+                v_row.name, v_perc, v_row.theory_present, v_row.theory_total,
+                round((v_row.theory_present + 4) * 100.0 / (v_row.theory_total + 4), 2),
+                round(v_row.theory_present * 100.0 / (v_row.theory_total + 4), 2));
+        else
+            v_message := format(
+                E'\U0001f319 Good Evening %s!\n\n'
+                'Your updated *Overall (Theory)* attendance is *%s%%* (%s/%s).\n\n',
+                v_row.name, v_perc, v_row.theory_present, v_row.theory_total);
+            if v_row.todays_json is not null then
+                v_message := v_message || E'*Today''s Summary:*\n';
+                for v_item in select * from jsonb_array_elements(v_row.todays_json) loop
+                    v_message := v_message || format(
+                        E'  %s %s: %s\n',
+                        case when v_item ->> 'status' = 'P' then E'✅' else E'❌' end,
+                        initcap(replace(v_item ->> 'subject', '_', ' ')),
+                        v_item ->> 'status');
+                end loop;
+            else
+                v_message := v_message || E'No attendance was marked for you today.\n';
+            end if;
+        end if;
+
+        perform net.http_post(
+            url := relay_url,
+            body := jsonb_build_object('to', v_row.whatsapp_no, 'message', v_message),
+            headers := '{"Content-Type": "application/json"}'::jsonb
+        );
+        v_count := v_count + 1;
+    end loop;
+
+    return v_count;
+end;
+$$;
+
+-- To enable, point the relay at your forwarder and uncomment (times UTC):
+-- select cron.schedule('morning-notifications', '30 1 * * *',
+--     $$select send_daily_notifications('morning', 'https://<project>.functions.supabase.co/twilio-relay')$$);
+-- select cron.schedule('evening-notifications', '30 10 * * *',
+--     $$select send_daily_notifications('evening', 'https://<project>.functions.supabase.co/twilio-relay')$$);
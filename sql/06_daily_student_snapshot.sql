@@ -0,0 +1,22 @@
+-- Run this in the Supabase SQL editor (after 03_student_daily_summary.sql).
+--
+-- Materializes the summary view so the scheduled jobs read precomputed
+-- rows instead of re-running the ten-table join per request. The app
+-- refreshes it shortly before each job via the RPC below.
+
+create materialized view if not exists daily_student_snapshot as
+select * from v_student_daily_summary;
+
+-- Required for REFRESH ... CONCURRENTLY.
+create unique index if not exists daily_student_snapshot_roll_no_idx
+    on daily_student_snapshot (roll_no);
+
+create or replace function refresh_daily_student_snapshot()
+returns void
+language plpgsql
+security definer
+as $$
+begin
+    refresh materialized view concurrently daily_student_snapshot;
+end;
+$$;